@@ -1,11 +1,14 @@
 from flask import Flask, jsonify, request, render_template
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
-import requests
+from http_client import client as http_client
 import os
+import queue
+import threading
+import time
 
 app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///messaggi.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('MESSAGGI_DATABASE_URI', 'sqlite:///messaggi.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db = SQLAlchemy(app)
 
@@ -19,6 +22,120 @@ class Messaggio(db.Model):
 with app.app_context():
     db.create_all()
 
+# Configurazione dell'inserimento a blocchi
+BULK_MAX_MESSAGGI = 1000  # Messaggi massimi per singola richiesta bulk
+GROUP_COMMIT_WINDOW = 0.005  # Secondi di attesa per raggruppare i POST singoli
+GROUP_COMMIT_MAX_BATCH = 500  # Messaggi massimi per singolo commit
+GROUP_COMMIT_TIMEOUT = 10  # Secondi massimi di attesa del commit per un POST singolo
+
+def valida_messaggio(data):
+    """Valida un messaggio e restituisce la riga da inserire, altrimenti solleva ValueError"""
+    if not isinstance(data, dict) or 'username' not in data or 'messaggio' not in data:
+        raise ValueError("Dati mancanti")
+    if not isinstance(data['username'], str) or not isinstance(data['messaggio'], str):
+        raise ValueError("Dati mancanti")
+    
+    username = data['username'].strip()
+    messaggio = data['messaggio'].strip()
+    
+    if not username or not messaggio:
+        raise ValueError("Username e messaggio non possono essere vuoti")
+    
+    if len(username) > 80 or len(messaggio) > 200:
+        raise ValueError("Username o messaggio troppo lunghi")
+    
+    return {"username": username, "msg": messaggio, "timestamp": datetime.utcnow()}
+
+def inserisci_messaggi(righe):
+    """Inserisce più messaggi con un solo executemany e un solo commit"""
+    try:
+        db.session.execute(Messaggio.__table__.insert(), righe)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+class CodaCommitTimeout(Exception):
+    """Il commit di gruppo non è stato completato entro il tempo massimo"""
+
+class CodaCommit:
+    """Raggruppa i POST singoli ricevuti in pochi millisecondi in un unico commit.
+
+    Un POST che supera il tempo massimo prima che il suo messaggio entri in un
+    commit viene segnato come abbandonato e non verrà più scritto, così il
+    client può ritentare senza creare duplicati.
+    """
+
+    def __init__(self, finestra, max_batch, timeout):
+        self.finestra = finestra
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.coda = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stato_lock = threading.Lock()
+
+    def inserisci(self, riga):
+        """Accoda un messaggio e attende che il suo commit sia completato"""
+        self._avvia()
+        richiesta = {"riga": riga, "evento": threading.Event(), "errore": None, "stato": "in_coda"}
+        self.coda.put(richiesta)
+        if not richiesta["evento"].wait(self.timeout):
+            with self._stato_lock:
+                if richiesta["stato"] == "in_coda":
+                    richiesta["stato"] = "abbandonata"
+                    raise CodaCommitTimeout("Commit del messaggio non completato in tempo")
+            # Il messaggio è già in un commit: se ne attende l'esito per non segnalare un falso errore
+            richiesta["evento"].wait()
+        if richiesta["errore"] is not None:
+            raise richiesta["errore"]
+
+    def _avvia(self):
+        with self._lock:
+            # Riavvia lo scrittore anche se il thread precedente è terminato
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._esegui, daemon=True)
+                self._thread.start()
+
+    def _raccogli(self, batch):
+        """Attende il primo messaggio e raccoglie quelli arrivati entro la finestra"""
+        batch.append(self.coda.get())
+        scadenza = time.monotonic() + self.finestra
+        while len(batch) < self.max_batch:
+            rimanente = scadenza - time.monotonic()
+            if rimanente <= 0:
+                break
+            try:
+                batch.append(self.coda.get(timeout=rimanente))
+            except queue.Empty:
+                break
+
+    def _esegui(self):
+        while True:
+            batch = []
+            # Se il ciclo viene interrotto senza completare il commit, i POST in attesa ricevono un errore
+            errore = RuntimeError("Commit di gruppo interrotto")
+            try:
+                self._raccogli(batch)
+                # I POST già scaduti non vengono scritti
+                with self._stato_lock:
+                    batch[:] = [richiesta for richiesta in batch if richiesta["stato"] != "abbandonata"]
+                    for richiesta in batch:
+                        richiesta["stato"] = "in_commit"
+                if batch:
+                    with app.app_context():
+                        inserisci_messaggi([richiesta["riga"] for richiesta in batch])
+                errore = None
+            except Exception as e:
+                app.logger.error(f"Errore nel commit di gruppo: {str(e)}")
+                errore = e
+            finally:
+                for richiesta in batch:
+                    richiesta["errore"] = errore
+                    richiesta["evento"].set()
+
+coda_commit = CodaCommit(GROUP_COMMIT_WINDOW, GROUP_COMMIT_MAX_BATCH, GROUP_COMMIT_TIMEOUT)
+
 @app.route('/')
 def home():
     return render_template('index.html')
@@ -35,7 +152,7 @@ def get_meteo():
             "timezone": "Europe/Rome"
         }
         
-        response = requests.get(url, params=params)
+        response = http_client.get(url, params=params)
         response.raise_for_status()  # Solleva un'eccezione per errori HTTP
         data = response.json()
         
@@ -55,25 +172,18 @@ def gestisci_messaggi():
     if request.method == 'POST':
         try:
             data = request.json
-            if not data or 'username' not in data or 'messaggio' not in data:
-                return jsonify({"error": "Dati mancanti"}), 400
-            
-            username = data['username'].strip()
-            messaggio = data['messaggio'].strip()
-            
-            if not username or not messaggio:
-                return jsonify({"error": "Username e messaggio non possono essere vuoti"}), 400
+            try:
+                riga = valida_messaggio(data)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
             
-            if len(username) > 80 or len(messaggio) > 200:
-                return jsonify({"error": "Username o messaggio troppo lunghi"}), 400
-            
-            nuovo_messaggio = Messaggio(username=username, msg=messaggio)
-            db.session.add(nuovo_messaggio)
-            db.session.commit()
+            coda_commit.inserisci(riga)
             return jsonify({"message": "Messaggio inviato con successo!"}), 201
             
+        except CodaCommitTimeout as e:
+            app.logger.error(f"Timeout nell'invio del messaggio: {str(e)}")
+            return jsonify({"error": str(e)}), 503
         except Exception as e:
-            db.session.rollback()
             app.logger.error(f"Errore nell'invio del messaggio: {str(e)}")
             return jsonify({"error": str(e)}), 500
 
@@ -89,5 +199,29 @@ def gestisci_messaggi():
             app.logger.error(f"Errore nel recupero dei messaggi: {str(e)}")
             return jsonify({"error": str(e)}), 500
 
+@app.route('/messaggi/bulk', methods=['POST'])
+def inserisci_messaggi_bulk():
+    try:
+        data = request.json
+        if not isinstance(data, list) or not data:
+            return jsonify({"error": "È richiesto un array di messaggi"}), 400
+        
+        if len(data) > BULK_MAX_MESSAGGI:
+            return jsonify({"error": f"Massimo {BULK_MAX_MESSAGGI} messaggi per richiesta"}), 400
+        
+        righe = []
+        for indice, messaggio in enumerate(data):
+            try:
+                righe.append(valida_messaggio(messaggio))
+            except ValueError as e:
+                return jsonify({"error": str(e), "indice": indice}), 400
+        
+        inserisci_messaggi(righe)
+        return jsonify({"message": "Messaggi inviati con successo!", "inseriti": len(righe)}), 201
+        
+    except Exception as e:
+        app.logger.error(f"Errore nell'invio dei messaggi: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True) 
\ No newline at end of file
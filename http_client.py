@@ -0,0 +1,192 @@
+"""Client HTTP condiviso per le chiamate verso servizi esterni"""
+from collections import OrderedDict
+from urllib.parse import urlsplit
+import logging
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Timeout (connessione, lettura) in secondi per host
+DEFAULT_TIMEOUT = (3.05, 10)
+HOST_TIMEOUTS = {
+    "api.openweathermap.org": (2, 4),
+    "api.open-meteo.com": (3.05, 6)
+}
+
+# Tempo massimo complessivo per tentativi e attese di una chiamata. Limita anche
+# i timeout di connessione e lettura, che però valgono per singola operazione sul
+# socket: un server che invia pochi byte alla volta può prolungare un tentativo
+DEFAULT_DEADLINE = 8
+
+# Codici di stato per cui vale la pena ritentare
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Il servizio è considerato irraggiungibile e non c'è una risposta in cache"""
+
+
+class CircuitBreaker:
+    """Interrompe le chiamate verso un host dopo troppi errori consecutivi"""
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Indica se la chiamata può partire; da aperto lascia passare un solo tentativo di prova"""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self._probing or time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class OutboundClient:
+    """Sessione con pool di connessioni, timeout per host, retry con jitter e circuit breaker.
+
+    I timeout di lettura non vengono ritentati. La scadenza di ogni chiamata
+    impedisce nuovi tentativi e attese oltre DEFAULT_DEADLINE e riduce i timeout
+    dei singoli tentativi, ma non interrompe una risposta già in arrivo.
+    Le ultime risposte valide vengono tenute in cache e restituite quando il
+    circuito è aperto o quando tutti i tentativi falliscono.
+    """
+
+    def __init__(self, host_timeouts=None, default_timeout=DEFAULT_TIMEOUT, deadline=DEFAULT_DEADLINE,
+                 retries=2, backoff=0.3, max_backoff=2.0, failure_threshold=3, reset_timeout=30,
+                 pool_maxsize=10, cache_size=128):
+        self.host_timeouts = host_timeouts or {}
+        self.default_timeout = default_timeout
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.cache_size = cache_size
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=pool_maxsize)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._breakers = {}
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _breaker(self, host):
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self._breakers[host]
+
+    def _cache_get(self, key):
+        with self._lock:
+            response = self._cache.get(key)
+            if response is not None:
+                self._cache.move_to_end(key)
+            return response
+
+    def _cache_put(self, key, response):
+        with self._lock:
+            self._cache[key] = response
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _attempts(self, url, params, timeout, deadline):
+        """Esegue i tentativi entro la scadenza, restituisce (risposta, errore)"""
+        connect_timeout, read_timeout = timeout
+        response = None
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                # Backoff esponenziale con full jitter, senza superare la scadenza
+                delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+                if time.monotonic() + delay >= deadline:
+                    break
+                time.sleep(delay)
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                response = self.session.get(
+                    url, params=params,
+                    timeout=(min(connect_timeout, remaining), min(read_timeout, remaining)))
+                error = None
+            except requests.exceptions.ReadTimeout as e:
+                # Un servizio bloccato non si sblocca ritentando subito
+                return None, e
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                response = None
+                error = e
+                continue
+            except requests.exceptions.RequestException as e:
+                return None, e
+            if response.status_code not in RETRY_STATUS:
+                break
+        return response, error
+
+    def get(self, url, params=None, fallback=True):
+        """Esegue una GET; con fallback=True usa l'ultima risposta valida se il servizio non risponde"""
+        host = urlsplit(url).hostname
+        timeout = self.host_timeouts.get(host, self.default_timeout)
+        breaker = self._breaker(host)
+        cache_key = requests.Request('GET', url, params=params).prepare().url
+
+        if not breaker.allow():
+            cached = self._cache_get(cache_key) if fallback else None
+            if cached is not None:
+                logger.warning(f"Circuito aperto per {host}, uso la risposta in cache")
+                return cached
+            raise CircuitOpenError(f"Servizio {host} temporaneamente non disponibile")
+
+        try:
+            response, error = self._attempts(url, params, timeout, time.monotonic() + self.deadline)
+        except BaseException:
+            # Ogni chiamata ammessa deve registrare un esito, altrimenti il circuito resta in prova
+            breaker.record_failure()
+            raise
+
+        if response is not None and response.status_code not in RETRY_STATUS:
+            breaker.record_success()
+            if response.ok:
+                self._cache_put(cache_key, response)
+            return response
+
+        breaker.record_failure()
+        cached = self._cache_get(cache_key) if fallback else None
+        if cached is not None:
+            logger.warning(f"Errore verso {host}, uso la risposta in cache")
+            return cached
+        if error is not None:
+            raise error
+        if response is None:
+            raise requests.exceptions.Timeout(f"Tempo massimo superato per {host}")
+        return response
+
+client = OutboundClient(HOST_TIMEOUTS)
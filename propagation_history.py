@@ -0,0 +1,277 @@
+"""Storico delle condizioni di propagazione con aggregazione per minuto, ora e giorno"""
+from array import array
+from datetime import datetime
+import base64
+import json
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Metriche salvate per ogni banda
+BAND_METRICS = ["muf", "noise_level", "reliability"]
+
+# Livelli di aggregazione: (nome, durata del bucket in secondi, numero di bucket)
+RESOLUTIONS = [
+    ("minute", 60, 1440),       # 24 ore
+    ("hour", 3600, 24 * 90),    # 90 giorni
+    ("day", 86400, 365 * 5)     # 5 anni
+]
+
+# Numero massimo di punti restituiti con risoluzione automatica
+MAX_POINTS = 500
+
+FORMAT_VERSION = 1
+
+# Limiti accettati per gli istanti dello storico (1970-01-01 .. 2100-01-01)
+MIN_TIMESTAMP = 0
+MAX_TIMESTAMP = 4102444800
+
+
+def parse_history_time(value, default):
+    """Interpreta un istante come timestamp Unix o data ISO, altrimenti solleva ValueError"""
+    if value is None:
+        return default
+    try:
+        timestamp = float(value)
+    except ValueError:
+        timestamp = datetime.fromisoformat(value).timestamp()
+
+    if not math.isfinite(timestamp) or not MIN_TIMESTAMP <= timestamp <= MAX_TIMESTAMP:
+        raise ValueError(f"Istante non valido: {value}")
+    return timestamp
+
+
+class _Tier:
+    """Buffer circolare di medie per una singola risoluzione"""
+
+    def __init__(self, name, step, capacity, n_columns):
+        self.name = name
+        self.step = step
+        self.capacity = capacity
+        self.n_columns = n_columns
+        self.buckets = array('q', [-1]) * capacity
+        self.counts = array('q', [0]) * capacity
+        self.sums = array('d', [0.0]) * (capacity * n_columns)
+
+    def add(self, timestamp, values):
+        bucket = int(timestamp) // self.step
+        slot = bucket % self.capacity
+        offset = slot * self.n_columns
+
+        # Campione più vecchio del bucket che occupa lo slot: scartato
+        if bucket < self.buckets[slot]:
+            return
+
+        # Il bucket è scaduto: riutilizza lo slot
+        if bucket > self.buckets[slot]:
+            self.buckets[slot] = bucket
+            self.counts[slot] = 0
+            for i in range(self.n_columns):
+                self.sums[offset + i] = 0.0
+
+        self.counts[slot] += 1
+        for i, value in enumerate(values):
+            self.sums[offset + i] += value
+
+    def query(self, start, end):
+        """Restituisce (timestamp, medie) per i bucket presenti tra start ed end"""
+        first = int(start) // self.step
+        last = int(end) // self.step
+        # Oltre la capacità del buffer non ci sono dati
+        first = max(first, last - self.capacity + 1)
+
+        points = []
+        for bucket in range(first, last + 1):
+            slot = bucket % self.capacity
+            count = self.counts[slot]
+            if self.buckets[slot] != bucket or count == 0:
+                continue
+            offset = slot * self.n_columns
+            means = [self.sums[offset + i] / count for i in range(self.n_columns)]
+            points.append((bucket * self.step, means))
+        return points
+
+    def to_dict(self):
+        return {
+            "step": self.step,
+            "capacity": self.capacity,
+            "buckets": base64.b64encode(self.buckets.tobytes()).decode('ascii'),
+            "counts": base64.b64encode(self.counts.tobytes()).decode('ascii'),
+            "sums": base64.b64encode(self.sums.tobytes()).decode('ascii')
+        }
+
+    def parse_dict(self, data):
+        """Decodifica i dati salvati, senza modificare il buffer"""
+        if data["step"] != self.step or data["capacity"] != self.capacity:
+            raise ValueError(f"Configurazione diversa per la risoluzione {self.name}")
+
+        buckets = array('q')
+        buckets.frombytes(base64.b64decode(data["buckets"]))
+        counts = array('q')
+        counts.frombytes(base64.b64decode(data["counts"]))
+        sums = array('d')
+        sums.frombytes(base64.b64decode(data["sums"]))
+
+        if (len(buckets) != self.capacity or len(counts) != self.capacity
+                or len(sums) != self.capacity * self.n_columns):
+            raise ValueError(f"Dati corrotti per la risoluzione {self.name}")
+        return buckets, counts, sums
+
+
+class PropagationHistory:
+    """Serie temporali di flusso solare, indice K e condizioni per banda.
+
+    Ogni campione viene sommato direttamente nei bucket di minuto, ora e
+    giorno, quindi la memoria occupata è fissa e le interrogazioni leggono
+    solo i bucket dell'intervallo richiesto. I campioni vengono raccolti a
+    intervalli regolari da un thread in background, indipendentemente dalle
+    richieste ricevute.
+    """
+
+    def __init__(self, bands, path=None, sample_interval=60, save_interval=60):
+        self.bands = list(bands)
+        self.columns = ["solar_flux", "k_index"] + [
+            f"{band}.{metric}" for band in self.bands for metric in BAND_METRICS
+        ]
+        self.tiers = {
+            name: _Tier(name, step, capacity, len(self.columns))
+            for name, step, capacity in RESOLUTIONS
+        }
+        self.path = path
+        self.sample_interval = sample_interval
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def record(self, solar_flux, k_index, conditions, timestamp=None):
+        """Aggiunge un campione nel formato restituito da get_band_conditions"""
+        if timestamp is None:
+            timestamp = time.time()
+
+        values = [float(solar_flux), float(k_index)]
+        for band in self.bands:
+            band_data = conditions[band]
+            values.extend(float(band_data[metric]) for metric in BAND_METRICS)
+
+        with self._lock:
+            for tier in self.tiers.values():
+                tier.add(timestamp, values)
+
+    def choose_resolution(self, start, end, now=None):
+        """Sceglie la risoluzione più fine che copre l'intervallo entro MAX_POINTS"""
+        if now is None:
+            now = time.time()
+        for name, step, capacity in RESOLUTIONS:
+            covers = now - start <= step * capacity
+            if covers and (end - start) / step <= MAX_POINTS:
+                return name
+        return RESOLUTIONS[-1][0]
+
+    def query(self, start, end, resolution=None):
+        """Restituisce (risoluzione, punti) per l'intervallo [start, end]"""
+        if resolution is None:
+            resolution = self.choose_resolution(start, end)
+        if resolution not in self.tiers:
+            raise ValueError(f"Risoluzione non valida: {resolution}")
+
+        with self._lock:
+            rows = self.tiers[resolution].query(start, end)
+
+        points = []
+        for timestamp, means in rows:
+            bands = {}
+            for b, band in enumerate(self.bands):
+                offset = 2 + b * len(BAND_METRICS)
+                bands[band] = {
+                    metric: round(means[offset + m], 1)
+                    for m, metric in enumerate(BAND_METRICS)
+                }
+            points.append({
+                "timestamp": timestamp,
+                "solar_flux": round(means[0], 1),
+                "k_index": round(means[1], 1),
+                "bands": bands
+            })
+        return resolution, points
+
+    def save(self):
+        """Salva lo storico su disco con scrittura atomica"""
+        if not self.path:
+            return
+        # Un solo salvataggio alla volta, senza bloccare record e query durante la scrittura
+        with self._save_lock:
+            with self._lock:
+                data = {
+                    "version": FORMAT_VERSION,
+                    "columns": self.columns,
+                    "tiers": {name: tier.to_dict() for name, tier in self.tiers.items()}
+                }
+
+            directory = os.path.dirname(os.path.abspath(self.path))
+            tmp_path = None
+            try:
+                fd, tmp_path = tempfile.mkstemp(
+                    dir=directory, prefix=os.path.basename(self.path) + ".", suffix=".tmp")
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                logger.error(f"Errore nel salvataggio dello storico di propagazione: {str(e)}")
+                if tmp_path and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+    def load(self):
+        """Carica lo storico da disco, se presente e compatibile"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            if (not isinstance(data, dict) or data.get("version") != FORMAT_VERSION
+                    or data.get("columns") != self.columns):
+                logger.warning("Storico di propagazione incompatibile, verrà ricreato")
+                return
+            # Si decodificano tutte le risoluzioni prima di sostituirne qualcuna
+            loaded = {name: tier.parse_dict(data["tiers"][name]) for name, tier in self.tiers.items()}
+            with self._lock:
+                for name, tier in self.tiers.items():
+                    tier.buckets, tier.counts, tier.sums = loaded[name]
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.error(f"Errore nel caricamento dello storico di propagazione: {str(e)}")
+
+    def sample(self, sampler):
+        """Registra il campione restituito da sampler, che può restituire None se i dati mancano"""
+        sample = sampler()
+        if sample is not None:
+            self.record(*sample)
+
+    def start(self, sampler):
+        """Avvia campionamento e salvataggio periodici in un thread in background.
+
+        sampler restituisce (flusso solare, indice K, condizioni per banda) oppure None.
+        """
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, args=(sampler,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, sampler):
+        last_save = time.monotonic()
+        while not self._stop.wait(self.sample_interval):
+            try:
+                self.sample(sampler)
+            except Exception as e:
+                logger.error(f"Errore nel campionamento della propagazione: {str(e)}")
+            if time.monotonic() - last_save >= self.save_interval:
+                self.save()
+                last_save = time.monotonic()
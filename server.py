@@ -6,7 +6,11 @@ import math
 import logging
 import random
 import json
+import atexit
 import requests
+from http_client import client as http_client
+from propagation_history import PropagationHistory, parse_history_time
+from solar_ingest import SolarIndexStore, SolarIngest, SOLAR_FLUX, K_INDEX
 
 # Configurazione logging
 logging.basicConfig(level=logging.INFO)
@@ -31,6 +35,25 @@ USER_LOCATION = {
     "timezone": "Europe/Rome"
 }
 
+# Bande HF per il calcolo della propagazione
+PROPAGATION_BANDS = ["80m", "40m", "30m", "20m", "17m", "15m", "12m", "10m"]
+
+# Indici solari e geomagnetici letti dai file NOAA SWPC depositati in questa cartella
+SOLAR_DATA_DIR = "solar_data"
+SOLAR_POLL_INTERVAL = 60  # secondi
+solar_store = SolarIndexStore()
+solar_ingest = SolarIngest(SOLAR_DATA_DIR, solar_store)
+solar_ingest.poll()
+solar_ingest.start(SOLAR_POLL_INTERVAL)
+
+# Storico delle condizioni di propagazione, campionato e salvato periodicamente su disco
+PROPAGATION_HISTORY_FILE = "propagation_history.json"
+PROPAGATION_SAMPLE_INTERVAL = 60  # secondi
+propagation_history = PropagationHistory(
+    PROPAGATION_BANDS, path=PROPAGATION_HISTORY_FILE, sample_interval=PROPAGATION_SAMPLE_INTERVAL)
+propagation_history.load()
+atexit.register(propagation_history.save)
+
 # Database delle bande radioamatoriali con limiti di potenza italiani
 RADIO_BANDS = {
     "HF": [
@@ -84,25 +107,14 @@ SATELLITES = {
 }
 
 def get_solar_data():
-    """Simula dati solari realistici"""
-    now = datetime.now()
-    hour = now.hour
-    
-    # Simula variazione giornaliera del flusso solare
-    base_flux = 120  # Valore medio tipico
-    daily_variation = math.sin(hour * math.pi / 12) * 10
-    solar_flux = base_flux + daily_variation
-    
-    # Simula indice K con variazioni più realistiche
-    k_index = max(0, min(9, random.gauss(3, 1)))
-    
-    return solar_flux, k_index
+    """Restituisce gli ultimi flusso solare e indice K acquisiti, o None se non disponibili"""
+    return solar_store.latest()
 
 def get_band_conditions(solar_flux, k_index):
     """Calcola condizioni di propagazione realistiche basate su dati solari"""
     conditions = {}
     
-    for band in ["80m", "40m", "30m", "20m", "17m", "15m", "12m", "10m"]:
+    for band in PROPAGATION_BANDS:
         # Calcola MUF (Maximum Usable Frequency)
         if band == "80m": base_muf = 4
         elif band == "40m": base_muf = 8
@@ -142,6 +154,16 @@ def get_band_conditions(solar_flux, k_index):
     
     return conditions
 
+def sample_propagation():
+    """Campione per lo storico: (flusso solare, indice K, condizioni per banda) oppure None"""
+    solar_data = get_solar_data()
+    if solar_data is None:
+        return None
+    solar_flux, k_index = solar_data
+    return solar_flux, k_index, get_band_conditions(solar_flux, k_index)
+
+propagation_history.start(sample_propagation)
+
 def get_signal_quality(elevation):
     """Stima la qualità del segnale basata sull'elevazione"""
     try:
@@ -229,7 +251,7 @@ def get_meteo():
             "lang": "it"
         }
         
-        current_response = requests.get(current_url, params=params)
+        current_response = http_client.get(current_url, params=params)
         current_data = current_response.json()
         logger.info(f"OpenWeatherMap response: {current_data}")
         
@@ -240,7 +262,7 @@ def get_meteo():
             
         # Ottieni previsioni per 5 giorni
         forecast_url = f"{OPENWEATHER_BASE_URL}/forecast"
-        forecast_response = requests.get(forecast_url, params=params)
+        forecast_response = http_client.get(forecast_url, params=params)
         forecast_data = forecast_response.json()
         
         if forecast_response.status_code != 200:
@@ -564,19 +586,55 @@ def calculate_link_budget():
 def get_propagation():
     """Fornisce condizioni di propagazione HF realistiche"""
     try:
-        solar_flux, k_index = get_solar_data()
+        solar_data = get_solar_data()
+        if solar_data is None:
+            return jsonify({"error": "Dati solari non disponibili"}), 503
+        
+        solar_flux, k_index = solar_data
         conditions = get_band_conditions(solar_flux, k_index)
         
         return jsonify({
             "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "solar_flux": round(solar_flux, 1),
             "k_index": round(k_index, 1),
+            "solar_flux_time": solar_store.get(SOLAR_FLUX)[1].strftime("%Y-%m-%d %H:%M:%S"),
+            "k_index_time": solar_store.get(K_INDEX)[1].strftime("%Y-%m-%d %H:%M:%S"),
             "bands": conditions
         })
     except Exception as e:
         logger.error(f"Errore nel recupero dati propagazione: {str(e)}")
         return jsonify({"error": "Errore interno del server"}), 500
 
+@app.route('/radio/propagation/history', methods=['GET'])
+def get_propagation_history():
+    """Restituisce lo storico della propagazione alla risoluzione adatta all'intervallo"""
+    try:
+        now = datetime.now().timestamp()
+        end = parse_history_time(request.args.get('end'), now)
+        start = parse_history_time(request.args.get('start'), end - 86400)
+        resolution = request.args.get('resolution')
+        if resolution == 'auto':
+            resolution = None
+        
+        if start > end:
+            return jsonify({"error": "Intervallo non valido"}), 400
+        
+        resolution, points = propagation_history.query(start, end, resolution)
+        for point in points:
+            point["timestamp"] = datetime.fromtimestamp(point["timestamp"]).strftime("%Y-%m-%d %H:%M:%S")
+        
+        return jsonify({
+            "start": datetime.fromtimestamp(start).strftime("%Y-%m-%d %H:%M:%S"),
+            "end": datetime.fromtimestamp(end).strftime("%Y-%m-%d %H:%M:%S"),
+            "resolution": resolution,
+            "points": points
+        })
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Errore nel recupero dello storico di propagazione: {str(e)}")
+        return jsonify({"error": "Errore interno del server"}), 500
+
 def get_satellite_pass(sat_name):
     """Calcola il prossimo passaggio del satellite"""
     now = datetime.now()
@@ -634,7 +692,7 @@ def get_status():
                 "appid": OPENWEATHER_API_KEY,
                 "units": "metric"
             }
-            response = requests.get(f"{OPENWEATHER_BASE_URL}/weather", params=params)
+            response = http_client.get(f"{OPENWEATHER_BASE_URL}/weather", params=params, fallback=False)
             services_status["openweather"]["status"] = response.status_code == 200
         except:
             services_status["openweather"]["status"] = False
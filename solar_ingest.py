@@ -0,0 +1,296 @@
+"""Acquisizione degli indici solari e geomagnetici dai file NOAA SWPC depositati in una cartella locale"""
+from datetime import datetime, timedelta
+import json
+import logging
+import os
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+SOLAR_FLUX = "solar_flux"
+K_INDEX = "k_index"
+
+# Prodotti JSON SWPC riconosciuti dal prefisso del nome del file; gli altri JSON vengono ignorati
+JSON_PRODUCTS = [
+    ("f107_cm_flux", SOLAR_FLUX),
+    ("10cm-flux", SOLAR_FLUX),
+    ("noaa-planetary-k-index", K_INDEX),
+    ("planetary_k_index", K_INDEX)
+]
+
+# Chiavi usate dai prodotti JSON SWPC per ciascun indice
+JSON_KEYS = {
+    SOLAR_FLUX: ["flux", "f10.7", "f107"],
+    K_INDEX: ["Kp", "kp", "kp_index", "estimated_kp"]
+}
+
+# Frequenza in MHz del flusso a 10.7 cm, usata per scartare le altre frequenze
+F107_FREQUENCY = 2800
+
+# Byte prima della posizione di lettura confrontati per riconoscere i file riscritti
+ANCHOR_SIZE = 256
+
+NUMBER_RE = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def parse_time_tag(value):
+    """Converte un time_tag SWPC (ISO, con o senza millisecondi) in datetime UTC"""
+    value = value.strip().replace('T', ' ').rstrip('Z')
+    if len(value) == 10:
+        return datetime.strptime(value, "%Y-%m-%d")
+    return datetime.strptime(value[:19], "%Y-%m-%d %H:%M:%S")
+
+
+class SolarIndexStore:
+    """Ultimi valori noti di flusso solare e indice K, letti in O(1)"""
+
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def update(self, index, value, timestamp):
+        """Aggiorna un indice solo se il campione è più recente di quello salvato"""
+        with self._lock:
+            current = self._values.get(index)
+            if current is None or timestamp >= current[1]:
+                self._values[index] = (value, timestamp)
+
+    def get(self, index):
+        """Restituisce (valore, timestamp) oppure None se l'indice non è disponibile"""
+        return self._values.get(index)
+
+    def latest(self):
+        """Restituisce (flusso solare, indice K) oppure None se manca uno dei due"""
+        flux = self._values.get(SOLAR_FLUX)
+        k_index = self._values.get(K_INDEX)
+        if flux is None or k_index is None:
+            return None
+        return flux[0], k_index[0]
+
+
+def parse_dsd_line(line):
+    """Riga di Daily Solar Data: data e flusso a 10.7 cm"""
+    fields = line.split()
+    if len(fields) < 4:
+        return []
+    flux = float(fields[3])
+    if flux < 0:
+        return []
+    date = datetime(int(fields[0]), int(fields[1]), int(fields[2]))
+    return [(SOLAR_FLUX, flux, date)]
+
+
+def parse_dgd_line(line):
+    """Riga di Daily Geomagnetic Data: ultimo indice K planetario valido del giorno"""
+    numbers = NUMBER_RE.findall(line)
+    if len(numbers) < 3 + 8:
+        return []
+    date = datetime(int(numbers[0]), int(numbers[1]), int(numbers[2]))
+    # Gli ultimi 8 valori sono gli indici K planetari a intervalli di 3 ore
+    planetary = [float(n) for n in numbers[-8:]]
+    for slot in range(7, -1, -1):
+        if planetary[slot] >= 0:
+            return [(K_INDEX, planetary[slot], date + timedelta(hours=3 * slot))]
+    return []
+
+
+TEXT_PRODUCTS = {
+    "solar": parse_dsd_line,
+    "geomagnetic": parse_dgd_line
+}
+
+# Prodotti testuali riconosciuti dall'intestazione ":Product:" o dal nome del file
+TEXT_PRODUCT_NAMES = {
+    "geomagnetic": ["daily geomagnetic data", "dgd", "daily-geomagnetic-indices"],
+    "solar": ["daily solar data", "dsd", "daily-solar-indices"]
+}
+
+
+def detect_text_product(text):
+    text = text.lower()
+    for product, names in TEXT_PRODUCT_NAMES.items():
+        if any(name in text for name in names):
+            return product
+    return None
+
+
+def detect_json_product(filename):
+    for prefix, index in JSON_PRODUCTS:
+        if filename.startswith(prefix):
+            return index
+    return None
+
+
+def parse_json_document(data, index):
+    """Estrae i campioni di un indice da un prodotto JSON SWPC (lista di oggetti o tabella con intestazione)"""
+    if not isinstance(data, list) or not data:
+        return []
+
+    # Formato tabellare: la prima riga contiene i nomi delle colonne
+    if isinstance(data[0], list):
+        header = data[0]
+        data = [dict(zip(header, row)) for row in data[1:]]
+
+    samples = []
+    for item in data:
+        if not isinstance(item, dict) or "time_tag" not in item:
+            continue
+        try:
+            timestamp = parse_time_tag(item["time_tag"])
+        except (ValueError, AttributeError):
+            continue
+        if index == SOLAR_FLUX and item.get("frequency") not in (None, F107_FREQUENCY):
+            continue
+        # Si usa la prima chiave con un valore numerico (planetary_k_index_1m ha "kp" come "2P")
+        for key in JSON_KEYS[index]:
+            if item.get(key) is None:
+                continue
+            try:
+                samples.append((index, float(item[key]), timestamp))
+            except (ValueError, TypeError):
+                continue
+            break
+    return samples
+
+
+class SolarIngest:
+    """Legge in modo incrementale i file SWPC di una cartella e aggiorna lo store.
+
+    I file di testo vengono seguiti come un tail: si legge solo da dove si era
+    arrivati e le righe incomplete restano in attesa del passaggio successivo.
+    I prodotti SWPC giornalieri vengono però riscritti sul posto: prima di
+    proseguire si controlla che la riga ":Issued:" e gli ultimi byte già letti
+    siano invariati, altrimenti il file viene riletto dall'inizio.
+    I documenti JSON non sono divisibili in righe e vengono riletti solo quando
+    cambiano dimensione o data di modifica; quelli non riconosciuti dal nome
+    vengono ignorati.
+    """
+
+    def __init__(self, directory, store):
+        self.directory = directory
+        self.store = store
+        self._files = {}
+        self._thread = None
+        self._stop = threading.Event()
+
+    def poll(self):
+        """Elabora le novità di tutti i file della cartella, restituisce i campioni letti"""
+        if not os.path.isdir(self.directory):
+            return 0
+
+        count = 0
+        for name in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, name)
+            if not os.path.isfile(path):
+                continue
+            try:
+                if name.endswith(".json"):
+                    samples = self._read_json(path)
+                elif name.endswith(".txt"):
+                    samples = self._read_text(path)
+                else:
+                    continue
+            except (OSError, ValueError) as e:
+                logger.error(f"Errore nella lettura di {name}: {str(e)}")
+                continue
+
+            for index, value, timestamp in samples:
+                self.store.update(index, value, timestamp)
+            count += len(samples)
+        return count
+
+    def _read_json(self, path):
+        index = detect_json_product(os.path.basename(path))
+        if index is None:
+            return []
+
+        stat = os.stat(path)
+        signature = (stat.st_ino, stat.st_size, stat.st_mtime)
+        state = self._files.get(path)
+        if state is not None and state["signature"] == signature:
+            return []
+
+        with open(path) as f:
+            data = json.load(f)
+        self._files[path] = {"signature": signature}
+        return parse_json_document(data, index)
+
+    def _same_prefix(self, f, state, stat):
+        """Verifica che la parte di file già letta non sia stata sostituita"""
+        if state["inode"] != stat.st_ino or stat.st_size < state["offset"]:
+            return False
+        header = state["header"]
+        if header:
+            f.seek(0)
+            if f.read(len(header)) != header:
+                return False
+        anchor = state["anchor"]
+        if anchor:
+            f.seek(state["offset"] - len(anchor))
+            if f.read(len(anchor)) != anchor:
+                return False
+        return True
+
+    def _read_text(self, path):
+        stat = os.stat(path)
+        state = self._files.get(path)
+        if state is not None and state["mtime"] == stat.st_mtime_ns and state["size"] == stat.st_size:
+            return []
+
+        with open(path, 'rb') as f:
+            # File nuovo, sostituito, troncato o riscritto sul posto: si riparte dall'inizio
+            if state is None or not self._same_prefix(f, state, stat):
+                state = {"inode": stat.st_ino, "offset": 0, "product": None, "header": b"", "anchor": b""}
+                self._files[path] = state
+            state["mtime"] = stat.st_mtime_ns
+            state["size"] = stat.st_size
+
+            f.seek(state["offset"])
+            chunk = f.read()
+
+        # Le righe senza terminatore sono ancora in scrittura
+        end = chunk.rfind(b"\n") + 1
+        if state["offset"] == 0:
+            issued = chunk.find(b":Issued:", 0, end)
+            if issued >= 0:
+                state["header"] = chunk[:chunk.index(b"\n", issued) + 1]
+        state["offset"] += end
+        state["anchor"] = (state["anchor"] + chunk[:end])[-ANCHOR_SIZE:]
+
+        samples = []
+        for raw_line in chunk[:end].decode('utf-8', errors='replace').splitlines():
+            line = raw_line.strip()
+            if not line:
+                continue
+            if line.startswith(":Product:"):
+                state["product"] = detect_text_product(line)
+                continue
+            if line.startswith((":", "#")):
+                continue
+
+            product = state["product"] or detect_text_product(os.path.basename(path))
+            if product is None:
+                continue
+            try:
+                samples.extend(TEXT_PRODUCTS[product](line))
+            except ValueError:
+                logger.warning(f"Riga non valida in {os.path.basename(path)}: {line}")
+        return samples
+
+    def start(self, interval=60):
+        """Avvia la lettura periodica in un thread in background"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, args=(interval,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Errore nell'acquisizione dei dati solari: {str(e)}")
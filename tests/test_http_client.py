@@ -0,0 +1,181 @@
+import time
+
+import pytest
+
+requests = pytest.importorskip("requests")
+
+import http_client  # noqa: E402
+from http_client import CircuitOpenError, OutboundClient  # noqa: E402
+
+URL = "http://api.example.org/weather"
+
+
+def make_response(status_code=200, content=b'{"temp": 20}'):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    return response
+
+
+class FakeSession:
+    """Sostituisce session.get restituendo o sollevando i risultati in ordine"""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = []
+
+    def get(self, url, params=None, timeout=None):
+        self.calls.append(timeout)
+        result = self.results.pop(0) if len(self.results) > 1 else self.results[0]
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+
+def make_client(*results, **kwargs):
+    kwargs.setdefault("retries", 0)
+    kwargs.setdefault("reset_timeout", 0.05)
+    client = OutboundClient(**kwargs)
+    client.session = FakeSession(*results)
+    return client
+
+
+def fail_times(client, count, **kwargs):
+    for _ in range(count):
+        with pytest.raises(requests.exceptions.RequestException):
+            client.get(URL, **kwargs)
+
+
+def test_circuit_opens_after_three_failures():
+    client = make_client(requests.exceptions.ConnectionError("giù"))
+
+    fail_times(client, 3, fallback=False)
+
+    with pytest.raises(CircuitOpenError):
+        client.get(URL, fallback=False)
+    assert len(client.session.calls) == 3
+
+
+def test_open_circuit_serves_cached_response():
+    good = make_response()
+    client = make_client(good, requests.exceptions.ConnectionError("giù"))
+
+    assert client.get(URL) is good
+    for _ in range(3):
+        assert client.get(URL) is good
+    calls = len(client.session.calls)
+
+    # Circuito aperto: nessuna chiamata e risposta dalla cache
+    assert client.get(URL) is good
+    assert len(client.session.calls) == calls
+
+
+def test_fallback_false_raises_when_open():
+    client = make_client(make_response(), requests.exceptions.ConnectionError("giù"))
+    client.get(URL)
+    fail_times(client, 3, fallback=False)
+
+    with pytest.raises(CircuitOpenError):
+        client.get(URL, fallback=False)
+
+
+def test_only_one_probe_after_reset_timeout():
+    client = make_client(requests.exceptions.ConnectionError("giù"))
+    fail_times(client, 3)
+    breaker = client._breaker("api.example.org")
+
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()
+    # Durante la prova le altre chiamate vengono respinte
+    assert not breaker.allow()
+
+
+def test_successful_probe_closes_circuit():
+    client = make_client(requests.exceptions.ConnectionError("giù"))
+    fail_times(client, 3)
+
+    time.sleep(0.06)
+    client.session = FakeSession(make_response())
+
+    assert client.get(URL).status_code == 200
+    assert client._breaker("api.example.org").opened_at is None
+    assert client.get(URL).status_code == 200
+
+
+def test_failed_probe_reopens_circuit():
+    client = make_client(requests.exceptions.ConnectionError("giù"))
+    fail_times(client, 3)
+
+    time.sleep(0.06)
+    fail_times(client, 1)
+
+    with pytest.raises(CircuitOpenError):
+        client.get(URL)
+    assert len(client.session.calls) == 4
+
+
+def test_unexpected_request_error_in_probe_releases_it():
+    client = make_client(requests.exceptions.ConnectionError("giù"))
+    fail_times(client, 3)
+
+    time.sleep(0.06)
+    client.session = FakeSession(requests.exceptions.ChunkedEncodingError("troncata"))
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        client.get(URL)
+
+    # La prova fallita riapre il circuito invece di lasciarlo bloccato in prova
+    time.sleep(0.06)
+    client.session = FakeSession(make_response())
+    assert client.get(URL).status_code == 200
+
+
+def test_connection_errors_are_retried():
+    client = make_client(
+        requests.exceptions.ConnectionError("giù"), make_response(), retries=2, backoff=0.001)
+
+    assert client.get(URL).status_code == 200
+    assert len(client.session.calls) == 2
+
+
+def test_read_timeout_is_not_retried():
+    client = make_client(requests.exceptions.ReadTimeout("bloccato"), retries=2, backoff=0.001)
+
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        client.get(URL)
+    assert len(client.session.calls) == 1
+
+
+def test_deadline_stops_retries_and_caps_timeouts():
+    client = make_client(
+        requests.exceptions.ConnectionError("giù"),
+        retries=10, backoff=0.05, max_backoff=0.05, deadline=0.2, default_timeout=(3, 10))
+
+    started = time.monotonic()
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.get(URL)
+
+    assert time.monotonic() - started < 0.5
+    assert all(connect <= 0.2 and read <= 0.2 for connect, read in client.session.calls)
+
+
+def test_host_timeouts_are_applied():
+    client = make_client(make_response(), host_timeouts={"api.example.org": (1, 2)})
+
+    client.get(URL)
+
+    assert client.session.calls == [(1, 2)]
+
+
+def test_retryable_status_is_failure_with_cache_fallback():
+    good = make_response()
+    client = make_client(good, make_response(503), retries=1, backoff=0.001)
+
+    client.get(URL)
+
+    assert client.get(URL) is good
+    assert client._breaker("api.example.org").failures == 1
+
+
+def test_default_hosts_have_their_own_timeouts():
+    assert set(http_client.HOST_TIMEOUTS.values()) != {http_client.DEFAULT_TIMEOUT}
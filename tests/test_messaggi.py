@@ -0,0 +1,167 @@
+import os
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("flask_sqlalchemy")
+os.environ["MESSAGGI_DATABASE_URI"] = "sqlite:///:memory:"
+
+import app as chat  # noqa: E402
+
+
+def messaggio(i):
+    return {"username": f"IZ{i}ABC", "messaggio": f"Messaggio {i}"}
+
+
+@pytest.fixture
+def client():
+    with chat.app.app_context():
+        chat.Messaggio.query.delete()
+        chat.db.session.commit()
+    return chat.app.test_client()
+
+
+def conta_messaggi():
+    with chat.app.app_context():
+        return chat.Messaggio.query.count()
+
+
+def test_bulk_inserts_all_rows_with_one_commit(client, monkeypatch):
+    commits = []
+    commit = chat.db.session.commit
+    monkeypatch.setattr(chat.db.session, "commit", lambda: commits.append(1) or commit())
+
+    response = client.post('/messaggi/bulk', json=[messaggio(i) for i in range(20)])
+
+    assert response.status_code == 201
+    assert response.get_json()["inseriti"] == 20
+    assert len(commits) == 1
+    assert conta_messaggi() == 20
+
+
+@pytest.mark.parametrize("payload", [[], {}, {"username": "IZ1ABC", "messaggio": "ciao"}])
+def test_bulk_requires_non_empty_array(client, payload):
+    response = client.post('/messaggi/bulk', json=payload)
+
+    assert response.status_code == 400
+    assert conta_messaggi() == 0
+
+
+def test_bulk_size_cap(client, monkeypatch):
+    monkeypatch.setattr(chat, "BULK_MAX_MESSAGGI", 3)
+
+    response = client.post('/messaggi/bulk', json=[messaggio(i) for i in range(4)])
+
+    assert response.status_code == 400
+    assert conta_messaggi() == 0
+
+
+def test_bulk_reports_first_invalid_item(client):
+    payload = [messaggio(0), {"username": "IZ1ABC", "messaggio": "   "}, {"username": "x" * 81, "messaggio": "ciao"}]
+
+    response = client.post('/messaggi/bulk', json=payload)
+
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Username e messaggio non possono essere vuoti", "indice": 1}
+    assert conta_messaggi() == 0
+
+
+def test_single_post_goes_through_group_commit(client):
+    response = client.post('/messaggi', json=messaggio(1))
+
+    assert response.status_code == 201
+    assert client.get('/messaggi').get_json()[0]["msg"] == "Messaggio 1"
+
+
+def invia_in_parallelo(coda, righe):
+    """Invia le righe da thread separati e restituisce l'esito di ciascuna"""
+    esiti = {}
+
+    def invia(riga):
+        try:
+            coda.inserisci(riga)
+            esiti[riga] = None
+        except BaseException as e:
+            esiti[riga] = e
+
+    threads = [threading.Thread(target=invia, args=(riga,)) for riga in righe]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return esiti
+
+
+def test_group_commit_batches_requests_in_window(monkeypatch):
+    batches = []
+    monkeypatch.setattr(chat, "inserisci_messaggi", lambda righe: batches.append(list(righe)))
+    coda = chat.CodaCommit(finestra=0.2, max_batch=100, timeout=5)
+
+    esiti = invia_in_parallelo(coda, range(10))
+
+    assert all(errore is None for errore in esiti.values())
+    assert len(batches) == 1
+    assert sorted(batches[0]) == list(range(10))
+
+
+def test_group_commit_error_reaches_every_waiter(monkeypatch):
+    def fallisce(righe):
+        raise RuntimeError("database bloccato")
+
+    monkeypatch.setattr(chat, "inserisci_messaggi", fallisce)
+    coda = chat.CodaCommit(finestra=0.2, max_batch=100, timeout=5)
+
+    esiti = invia_in_parallelo(coda, range(5))
+
+    assert len(esiti) == 5
+    assert all(str(errore) == "database bloccato" for errore in esiti.values())
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_dead_writer_is_restarted(monkeypatch):
+    batches = []
+
+    def muore_la_prima_volta(righe):
+        if not batches:
+            batches.append(None)
+            raise KeyboardInterrupt
+        batches.append(list(righe))
+
+    monkeypatch.setattr(chat, "inserisci_messaggi", muore_la_prima_volta)
+    coda = chat.CodaCommit(finestra=0, max_batch=100, timeout=5)
+
+    with pytest.raises(RuntimeError):
+        coda.inserisci("primo")
+    coda._thread.join(timeout=5)
+    assert not coda._thread.is_alive()
+
+    coda.inserisci("secondo")
+
+    assert batches == [None, ["secondo"]]
+
+
+def test_timed_out_request_is_not_written(monkeypatch):
+    via_libera = threading.Event()
+    batches = []
+
+    def lento(righe):
+        via_libera.wait(5)
+        batches.append(list(righe))
+
+    monkeypatch.setattr(chat, "inserisci_messaggi", lento)
+    coda = chat.CodaCommit(finestra=0, max_batch=1, timeout=0.1)
+
+    # Il primo messaggio entra nel commit e aspetta il suo esito oltre il timeout
+    primo = threading.Thread(target=coda.inserisci, args=("primo",))
+    primo.start()
+    time.sleep(0.05)
+
+    with pytest.raises(chat.CodaCommitTimeout):
+        coda.inserisci("secondo")
+
+    via_libera.set()
+    primo.join(timeout=5)
+    time.sleep(0.1)
+
+    assert batches == [["primo"]]
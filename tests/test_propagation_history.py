@@ -0,0 +1,154 @@
+import json
+import time
+
+import pytest
+
+from propagation_history import PropagationHistory, parse_history_time
+
+BANDS = ["20m", "40m"]
+# Inizio di un giorno UTC, per avere bucket allineati in tutte le risoluzioni
+NOW = 1_790_000_000 - 1_790_000_000 % 86400
+
+
+def conditions(muf=10.0, noise=-110.0, reliability=80.0):
+    return {band: {"muf": muf, "noise_level": noise, "reliability": reliability} for band in BANDS}
+
+
+def make_history(**kwargs):
+    return PropagationHistory(BANDS, **kwargs)
+
+
+def test_samples_are_averaged_per_bucket():
+    history = make_history()
+    history.record(100, 2, conditions(muf=10), timestamp=NOW)
+    history.record(120, 4, conditions(muf=20), timestamp=NOW + 30)
+
+    resolution, points = history.query(NOW, NOW + 59, "minute")
+
+    assert resolution == "minute"
+    assert len(points) == 1
+    assert points[0]["timestamp"] == NOW
+    assert points[0]["solar_flux"] == 110.0
+    assert points[0]["k_index"] == 3.0
+    assert points[0]["bands"]["20m"] == {"muf": 15.0, "noise_level": -110.0, "reliability": 80.0}
+
+
+def test_rollups_cover_hour_and_day():
+    history = make_history()
+    for minute in range(120):
+        history.record(100 + minute, 3, conditions(), timestamp=NOW + minute * 60)
+
+    _, hours = history.query(NOW, NOW + 7200, "hour")
+    _, days = history.query(NOW, NOW + 7200, "day")
+
+    assert [p["solar_flux"] for p in hours] == [129.5, 189.5]
+    assert [p["solar_flux"] for p in days] == [159.5]
+
+
+def test_ring_buffer_overwrites_oldest_minutes():
+    history = make_history()
+    history.record(100, 3, conditions(), timestamp=NOW)
+    # Stesso slot un giorno dopo: il minuto vecchio viene sostituito
+    history.record(150, 3, conditions(), timestamp=NOW + 1440 * 60)
+
+    _, old = history.query(NOW, NOW + 59, "minute")
+    _, new = history.query(NOW + 1440 * 60, NOW + 1440 * 60 + 59, "minute")
+
+    assert old == []
+    assert [p["solar_flux"] for p in new] == [150.0]
+
+
+def test_older_sample_does_not_replace_newer_bucket():
+    history = make_history()
+    history.record(150, 3, conditions(), timestamp=NOW)
+    history.record(100, 3, conditions(), timestamp=NOW - 1440 * 60)
+
+    _, points = history.query(NOW - 60, NOW, "minute")
+
+    assert [p["solar_flux"] for p in points] == [150.0]
+
+
+def test_choose_resolution():
+    history = make_history()
+
+    assert history.choose_resolution(NOW - 3600, NOW, now=NOW) == "minute"
+    assert history.choose_resolution(NOW - 7 * 86400, NOW, now=NOW) == "hour"
+    assert history.choose_resolution(NOW - 365 * 86400, NOW, now=NOW) == "day"
+    # Oltre le 24 ore i minuti non sono più disponibili
+    assert history.choose_resolution(NOW - 2 * 86400, NOW - 2 * 86400 + 600, now=NOW) == "hour"
+
+
+def test_invalid_resolution():
+    with pytest.raises(ValueError):
+        make_history().query(NOW, NOW + 60, "week")
+
+
+def test_sample_records_only_available_data():
+    history = make_history()
+
+    history.sample(lambda: None)
+    history.sample(lambda: (130, 2, conditions()))
+
+    now = time.time()
+    _, points = history.query(now - 60, now, "minute")
+    assert [p["solar_flux"] for p in points] == [130.0]
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "history.json")
+    history = make_history(path=path)
+    for minute in range(5):
+        history.record(100 + minute, 3, conditions(), timestamp=NOW + minute * 60)
+    history.save()
+
+    loaded = make_history(path=path)
+    loaded.load()
+
+    for resolution in ("minute", "hour", "day"):
+        assert loaded.query(NOW, NOW + 3600, resolution) == history.query(NOW, NOW + 3600, resolution)
+    assert [p.name for p in tmp_path.iterdir()] == ["history.json"]
+
+
+@pytest.mark.parametrize("content", [
+    "{not json",
+    "[]",
+    json.dumps({"version": 1, "columns": [], "tiers": {}}),
+])
+def test_load_ignores_invalid_file(tmp_path, content):
+    path = tmp_path / "history.json"
+    path.write_text(content)
+    history = make_history(path=str(path))
+
+    history.load()
+
+    assert history.query(NOW - 86400, NOW, "minute")[1] == []
+
+
+def test_load_corrupt_tier_keeps_history_empty(tmp_path):
+    path = str(tmp_path / "history.json")
+    history = make_history(path=path)
+    history.record(100, 3, conditions(), timestamp=NOW)
+    history.save()
+    with open(path) as f:
+        data = json.load(f)
+    data["tiers"]["day"]["sums"] = "AAAA"
+    with open(path, 'w') as f:
+        json.dump(data, f)
+
+    loaded = make_history(path=path)
+    loaded.load()
+
+    # Nessuna risoluzione viene caricata se una è corrotta
+    assert loaded.query(NOW, NOW + 59, "minute")[1] == []
+
+
+def test_parse_history_time():
+    assert parse_history_time(None, 123.0) == 123.0
+    assert parse_history_time("1790000000", None) == 1790000000.0
+    assert parse_history_time("2026-10-19T12:00:00+00:00", None) == 1792411200.0
+
+
+@pytest.mark.parametrize("value", ["inf", "-inf", "nan", "1e20", "-1", "yesterday", "9999-01-01"])
+def test_parse_history_time_rejects_invalid_values(value):
+    with pytest.raises(ValueError):
+        parse_history_time(value, None)
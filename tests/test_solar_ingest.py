@@ -0,0 +1,171 @@
+from datetime import datetime
+import os
+import shutil
+
+from solar_ingest import (
+    SolarIndexStore, SolarIngest, SOLAR_FLUX, K_INDEX, detect_text_product, parse_dgd_line
+)
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def make_ingest(tmp_path, *names):
+    for name in names:
+        shutil.copy(os.path.join(FIXTURES, name), tmp_path / name)
+    store = SolarIndexStore()
+    return SolarIngest(str(tmp_path), store), store
+
+
+def rewrite(path, text):
+    """Riscrive il file sul posto, come curl -o o wget -O, spostando in avanti la data di modifica"""
+    stat = os.stat(path)
+    with open(path, 'w') as f:
+        f.write(text)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_detect_text_product():
+    assert detect_text_product(":Product: Daily Solar Data            DSD.txt") == "solar"
+    assert detect_text_product(":Product: Daily Geomagnetic Data          DGD.txt") == "geomagnetic"
+    assert detect_text_product("daily-solar-indices.txt") == "solar"
+    assert detect_text_product("solar_regions.txt") is None
+
+
+def test_reads_text_fixtures(tmp_path):
+    ingest, store = make_ingest(tmp_path, "DSD.txt", "DGD.txt")
+
+    assert ingest.poll() == 5
+    assert store.get(SOLAR_FLUX) == (155.0, datetime(2026, 10, 17))
+    # Gli ultimi due intervalli del 17 ottobre sono mancanti (-1)
+    assert store.get(K_INDEX) == (3.67, datetime(2026, 10, 17, 15))
+    assert store.latest() == (155.0, 3.67)
+
+
+def test_header_detection_without_known_filename(tmp_path):
+    shutil.copy(os.path.join(FIXTURES, "DGD.txt"), tmp_path / "geo.txt")
+    store = SolarIndexStore()
+
+    SolarIngest(str(tmp_path), store).poll()
+
+    assert store.get(K_INDEX)[0] == 3.67
+    assert store.get(SOLAR_FLUX) is None
+
+
+def test_missing_kp_values():
+    line = "2026 10 18     4  1-1-1-1-1-1-1-1     5  1-1-1-1-1-1-1-1     4  1.33-1.00-1.00-1.00-1.00-1.00-1.00-1.00"
+    assert parse_dgd_line(line) == [(K_INDEX, 1.33, datetime(2026, 10, 18))]
+    assert parse_dgd_line(line.replace("1.33", "-1.00")) == []
+
+
+def test_unchanged_file_is_not_reread(tmp_path):
+    ingest, store = make_ingest(tmp_path, "DSD.txt")
+
+    ingest.poll()
+
+    assert ingest.poll() == 0
+
+
+def test_partial_line_waits_for_terminator(tmp_path):
+    ingest, store = make_ingest(tmp_path, "DSD.txt")
+    ingest.poll()
+    path = tmp_path / "DSD.txt"
+
+    with open(path, 'a') as f:
+        f.write("2026 10 18  16")
+    assert ingest.poll() == 0
+    assert store.get(SOLAR_FLUX)[0] == 155.0
+
+    with open(path, 'a') as f:
+        f.write("2    115      650      0    -999   B8.2  2  0  0  5  0  0  0\n")
+    assert ingest.poll() == 1
+    assert store.get(SOLAR_FLUX) == (162.0, datetime(2026, 10, 18))
+
+
+def test_truncated_file_is_reread(tmp_path):
+    ingest, store = make_ingest(tmp_path, "DSD.txt")
+    ingest.poll()
+    path = tmp_path / "DSD.txt"
+
+    rewrite(path, "2026 10 18  160    112      650      0    -999   B8.2  2  0  0  5  0  0  0\n")
+
+    assert ingest.poll() == 1
+    assert store.get(SOLAR_FLUX) == (160.0, datetime(2026, 10, 18))
+
+
+def test_replaced_file_is_reread(tmp_path):
+    ingest, store = make_ingest(tmp_path, "DSD.txt")
+    ingest.poll()
+    path = tmp_path / "DSD.txt"
+    with open(path) as f:
+        text = f.read()
+
+    replacement = tmp_path / "DSD.tmp"
+    replacement.write_text(text + "2026 10 18  160    112      650      0    -999   B8.2  2  0  0  5  0  0  0\n")
+    os.replace(replacement, path)
+
+    assert ingest.poll() == 4
+    assert store.get(SOLAR_FLUX) == (160.0, datetime(2026, 10, 18))
+
+
+def test_rolling_file_rewritten_in_place(tmp_path):
+    ingest, store = make_ingest(tmp_path, "DSD.txt")
+    ingest.poll()
+    path = tmp_path / "DSD.txt"
+    with open(path) as f:
+        text = f.read()
+
+    # Stessa dimensione: il giorno più vecchio esce e ne entra uno nuovo
+    rolled = (text.replace("18 Oct 2026", "19 Oct 2026")
+              .replace("2026 10 15  148     97      520      1    -999   B7.1  3  0  0  6  0  0  0\n", "")
+              + "2026 10 18  171    120      700      1    -999   B8.5  6  1  0  8  1  0  0\n")
+    assert len(rolled) == len(text)
+    rewrite(path, rolled)
+
+    ingest.poll()
+    assert store.get(SOLAR_FLUX) == (171.0, datetime(2026, 10, 18))
+
+
+def test_rewrite_a_few_bytes_longer_restarts(tmp_path):
+    ingest, store = make_ingest(tmp_path, "DSD.txt")
+    ingest.poll()
+    path = tmp_path / "DSD.txt"
+    with open(path) as f:
+        text = f.read()
+
+    # Stessa intestazione ma contenuto diverso: la vecchia posizione cadrebbe a metà riga
+    rolled = (text.replace("2026 10 15  148     97      520      1    -999   B7.1  3  0  0  6  0  0  0\n", "")
+              + "2026 10 18  171    120      700      1    -999   B8.5  6  1  0  8  1  0  0\n"
+              + "2026 10 19  176    122      710      0    -999   B8.6  4  0  0  6  0  0  0\n")
+    rewrite(path, rolled)
+
+    assert ingest.poll() == 4
+    assert store.get(SOLAR_FLUX) == (176.0, datetime(2026, 10, 19))
+
+
+def test_reads_json_products(tmp_path):
+    ingest, store = make_ingest(tmp_path, "f107_cm_flux.json", "noaa-planetary-k-index.json")
+
+    ingest.poll()
+
+    # Solo la riga a 2800 MHz è il flusso a 10.7 cm
+    assert store.get(SOLAR_FLUX) == (157.0, datetime(2026, 10, 17, 20))
+    assert store.get(K_INDEX) == (4.33, datetime(2026, 10, 17, 18))
+
+
+def test_reads_planetary_k_index_1m(tmp_path):
+    ingest, store = make_ingest(tmp_path, "planetary_k_index_1m.json")
+
+    ingest.poll()
+
+    # "kp" è testuale ("2P"): si ripiega su kp_index
+    assert store.get(K_INDEX) == (3.0, datetime(2026, 10, 18, 12, 1))
+    assert store.get(SOLAR_FLUX) is None
+
+
+def test_unknown_json_products_are_ignored(tmp_path):
+    ingest, store = make_ingest(tmp_path, "xrays-6-hour.json", "DGD.txt")
+
+    ingest.poll()
+
+    assert store.get(SOLAR_FLUX) is None
+    assert store.latest() is None